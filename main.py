@@ -1,18 +1,80 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, HttpUrl
+from fastapi.responses import Response
+from pydantic import BaseModel, HttpUrl, field_validator
 import asyncio
+import hashlib
+import heapq
 import httpx
+import logging
+import orjson
+import re
+import redis.asyncio
 import time
 import os
-from typing import Dict, Any
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit
+from types import MappingProxyType
+from uuid import uuid4
+from typing import Annotated, Dict, Any, Mapping, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Read once at import rather than on every cache miss
+GOOGLE_PAGESPEED_API_KEY = os.getenv("GOOGLE_PAGESPEED_API_KEY", "")
+APP_URL = os.getenv("APP_URL", "http://127.0.0.1:8000")
+REDIS_URL = os.getenv("REDIS_URL", "")
+REDIS_TIMEOUT = 0.5  # seconds
+
 
 app = FastAPI()
 
+
+@app.on_event("startup")
+async def startup():
+    # One pooled client for the app's lifetime so cache misses reuse
+    # keep-alive connections to googleapis.com instead of a fresh TCP+TLS
+    # handshake per request. HTTP/2 multiplexes concurrent audits over a
+    # single connection.
+    app.state.client = httpx.AsyncClient(
+        http2=True,
+        timeout=60.0,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+    )
+    # Shared cache across Gunicorn workers when Redis is configured;
+    # otherwise each worker keeps its own in-memory LRU. Short timeouts so an
+    # unreachable Redis degrades to a cache miss instead of hanging requests.
+    app.state.redis = (
+        redis.asyncio.from_url(
+            REDIS_URL,
+            socket_timeout=REDIS_TIMEOUT,
+            socket_connect_timeout=REDIS_TIMEOUT,
+        )
+        if REDIS_URL
+        else None
+    )
+    if app.state.redis is not None:
+        app.state.acquire_pagespeed_slot = app.state.redis.register_script(ACQUIRE_SLOT_SCRIPT)
+    elif WEB_CONCURRENCY > PAGESPEED_MAX_CONCURRENCY:
+        logger.warning(
+            "PAGESPEED_MAX_CONCURRENCY=%d can't be enforced across %d workers without "
+            "REDIS_URL; allowing up to %d concurrent PageSpeed calls",
+            PAGESPEED_MAX_CONCURRENCY, WEB_CONCURRENCY, WEB_CONCURRENCY,
+        )
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await app.state.client.aclose()
+    if app.state.redis is not None:
+        await app.state.redis.aclose()
+
 # CORS configuration
 origins = [
     "http://localhost:3000",
@@ -29,185 +91,423 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the frontends read the ETag to send back as If-None-Match
+    expose_headers=["ETag"],
 )
 
-# Simple in-memory cache: {url: {"data": ..., "timestamp": ...}}
-CACHE: Dict[str, Dict[str, Any]] = {}
+# Cache entries: {"body": <JSON bytes>, "etag": ..., "timestamp": ..., "is_mock": ...}, kept
+# in Redis when REDIS_URL is set, else in a bounded in-memory LRU. Storing the
+# encoded body means cache hits are sent without re-serializing the audit.
+# Entries outlive CACHE_DURATION so expired real audits can still be served
+# as a stale fallback; the in-memory LRU only drops them by capacity.
+CACHE: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+CACHE_MAX_ENTRIES = 1024
 CACHE_DURATION = 600  # 10 minutes in seconds
 MOCK_CACHE_DURATION = 30  # transient failures shouldn't poison the cache for 10 minutes
+STALE_CACHE_DURATION = 86400  # how long Redis keeps real audits for the stale fallback
+REDIS_KEY_PREFIX = "audit:"
+
+
+async def cache_get(url: str) -> Optional[Dict[str, Any]]:
+    if app.state.redis is None:
+        entry = CACHE.get(url)
+        if entry is not None:
+            CACHE.move_to_end(url)
+        return entry
+    try:
+        cached = await app.state.redis.hgetall(REDIS_KEY_PREFIX + url)
+    except redis.RedisError as e:
+        # Treat an unreachable cache as a miss rather than failing the audit
+        logger.warning("Redis get failed: %s: %s", type(e).__name__, e)
+        return None
+    if not cached:
+        return None
+    return {
+        "body": cached[b"body"],
+        "etag": cached[b"etag"].decode(),
+        "timestamp": float(cached[b"timestamp"]),
+        "is_mock": cached[b"is_mock"] == b"1",
+    }
+
+
+def make_entry(data: Dict[str, Any], timestamp: float) -> Dict[str, Any]:
+    body = orjson.dumps(data)
+    etag = '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+    return {"body": body, "etag": etag, "timestamp": timestamp, "is_mock": data["is_mock"]}
+
+
+def entry_max_age(entry: Dict[str, Any]) -> int:
+    return MOCK_CACHE_DURATION if entry["is_mock"] else CACHE_DURATION
+
+
+def is_fresh(entry: Dict[str, Any], now: float) -> bool:
+    return now - entry["timestamp"] < entry_max_age(entry)
+
+
+async def cache_set(url: str, entry: Dict[str, Any]) -> None:
+    if app.state.redis is None:
+        CACHE[url] = entry
+        CACHE.move_to_end(url)
+        if len(CACHE) > CACHE_MAX_ENTRIES:
+            CACHE.popitem(last=False)
+        return
+    key = REDIS_KEY_PREFIX + url
+    ttl = MOCK_CACHE_DURATION if entry["is_mock"] else STALE_CACHE_DURATION
+    try:
+        pipe = app.state.redis.pipeline(transaction=True)
+        pipe.hset(key, mapping={
+            "body": entry["body"],
+            "etag": entry["etag"],
+            "timestamp": entry["timestamp"],
+            "is_mock": int(entry["is_mock"]),
+        })
+        pipe.expire(key, ttl)
+        await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Redis set failed: %s: %s", type(e).__name__, e)
+
 
 # PageSpeed rate-limits per second; cap concurrent upstream calls so a burst
-# of frontend requests doesn't trip the quota all at once
-PAGESPEED_SEMAPHORE = asyncio.Semaphore(2)
+# of frontend requests doesn't trip the quota all at once.
+# With Redis the cap holds across all Gunicorn workers. Without it each worker
+# gets an equal share of the cap, but at least one slot, so more workers than
+# PAGESPEED_MAX_CONCURRENCY exceed it (startup logs a warning).
+PAGESPEED_MAX_CONCURRENCY = int(os.getenv("PAGESPEED_MAX_CONCURRENCY", "2"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+PAGESPEED_SEMAPHORE = asyncio.Semaphore(max(1, PAGESPEED_MAX_CONCURRENCY // WEB_CONCURRENCY))
+
+# Deployment-wide slots are members of a Redis sorted set scored by acquire
+# time. Slots older than the lease are reclaimed, so a worker that dies
+# mid-call can't leak one; the lease outlasts the 180s upstream timeout.
+PAGESPEED_SLOTS_KEY = "pagespeed:slots"
+PAGESPEED_SLOT_LEASE = 200  # seconds
+PAGESPEED_SLOT_POLL = 0.1  # seconds between attempts while the cap is full
+ACQUIRE_SLOT_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', tonumber(ARGV[1]) - tonumber(ARGV[2]))
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[3]) then
+    redis.call('ZADD', KEYS[1], ARGV[1], ARGV[4])
+    return 1
+end
+return 0
+"""
+
+
+@asynccontextmanager
+async def pagespeed_slot():
+    acquired = False
+    if app.state.redis is not None:
+        token = uuid4().hex
+        try:
+            while not await app.state.acquire_pagespeed_slot(
+                keys=[PAGESPEED_SLOTS_KEY],
+                args=[time.time(), PAGESPEED_SLOT_LEASE, PAGESPEED_MAX_CONCURRENCY, token],
+            ):
+                await asyncio.sleep(PAGESPEED_SLOT_POLL)
+            acquired = True
+        except redis.RedisError as e:
+            # Fall back to this worker's share rather than failing the audit
+            logger.warning("Redis slot acquire failed: %s: %s", type(e).__name__, e)
+
+    if not acquired:
+        async with PAGESPEED_SEMAPHORE:
+            yield
+        return
+
+    try:
+        yield
+    finally:
+        try:
+            await app.state.redis.zrem(PAGESPEED_SLOTS_KEY, token)
+        except redis.RedisError as e:
+            # The lease reclaims the slot eventually
+            logger.warning("Redis slot release failed: %s: %s", type(e).__name__, e)
+
+# Shared read-only default for .get() chains, instead of a fresh {} per call
+EMPTY: Mapping[str, Any] = MappingProxyType({})
+
+# (result key, result score key, Lighthouse audit id) for each reported metric
+METRIC_AUDITS = (
+    ("fcp", "fcp_score", "first-contentful-paint"),
+    ("lcp", "lcp_score", "largest-contentful-paint"),
+    ("cls", "cls_score", "cumulative-layout-shift"),
+    ("tbt", "tbt_score", "total-blocking-time"),
+    ("si", "si_score", "speed-index"),
+)
+
+PAGESPEED_API_URL = "https://www.googleapis.com/pagespeedonline/v5/runPagespeed"
+PAGESPEED_AUTH_PARAMS = {"key": GOOGLE_PAGESPEED_API_KEY} if GOOGLE_PAGESPEED_API_KEY else {}
+# Static query params shared by every audit; requests only add "url".
+# Valid categories: accessibility, best-practices, performance, pwa, seo
+PAGESPEED_BASE_PARAMS = {
+    "strategy": "mobile",
+    "category": ("performance", "accessibility", "best-practices", "seo"),
+    # Partial response: only the parts of lighthouseResult run_audit reads,
+    # skipping loadingExperience, screenshots, i18n strings, stack packs etc.
+    "fields": "lighthouseResult(categories,audits)",
+    **PAGESPEED_AUTH_PARAMS,
+}
+# Add Referer header to satisfy API key restrictions
+PAGESPEED_HEADERS = {"Referer": APP_URL}
+
+# Audits currently being fetched, so concurrent misses for the same URL
+# share one upstream call instead of each burning quota
+INFLIGHT: Dict[str, "asyncio.Task[Dict[str, Any]]"] = {}
+
+# Fallback audit served when PageSpeed is unavailable. Built once at import;
+# requests only add their own "url". Shared across responses, so never mutate.
+_MOCK_TEMPLATE: Dict[str, Any] = {
+    "scores": {
+        "performance": 0.72,
+        "accessibility": 0.85,
+        "best_practices": 0.90,
+        "seo": 0.92,
+    },
+    "metrics": {
+        "fcp": "1.2 s",
+        "fcp_score": 0.85,
+        "lcp": "2.1 s",
+        "lcp_score": 0.88,
+        "cls": "0.05",
+        "cls_score": 0.95,
+        "tbt": "120 ms",
+        "tbt_score": 0.90,
+        "si": "1.8 s",
+        "si_score": 0.82
+    },
+    "opportunities": (
+        {
+            "id": "unused-javascript",
+            "title": "Reduce unused JavaScript",
+            "description": "Remove unused JavaScript to reduce bytes consumed by network activity.",
+            "score": 0.65,
+            "saving": 350
+        },
+        {
+            "id": "modern-image-formats",
+            "title": "Serve images in next-gen formats",
+            "description": "Image formats like WebP and AVIF often provide better compression than PNG or JPEG.",
+            "score": 0.70,
+            "saving": 200
+        },
+    ),
+    "is_mock": True
+}
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+TRACKING_PARAMS = {"gclid", "fbclid"}
+
+
+# Canonical form of a URL, used both as the cache key and as the URL sent to
+# PageSpeed, so trivially different spellings of one page share a cache entry
+@lru_cache(maxsize=4096)
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    netloc = parts.hostname or ""
+    if ":" in netloc:
+        netloc = f"[{netloc}]"  # IPv6 literal
+    if parts.port is not None and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{parts.port}"
+    # Userinfo is part of the audited target (e.g. basic-auth staging sites),
+    # so it stays in the key, byte-for-byte
+    userinfo, at, _ = parts.netloc.rpartition("@")
+    if at:
+        netloc = f"{userinfo}@{netloc}"
+    path = parts.path.rstrip("/") or "/"
+    # Filter the raw pairs rather than re-encoding, so the rest of the query
+    # string reaches PageSpeed byte-for-byte
+    query = "&".join(
+        pair
+        for pair in parts.query.split("&")
+        if pair and not pair.startswith("utm_") and pair.partition("=")[0] not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def build_mock(url: str) -> Dict[str, Any]:
+    return {"url": url, **_MOCK_TEMPLATE}
+
+
+# Hosts under the reserved .mock TLD (e.g. https://example.mock) always get
+# the mock audit, without matching real URLs that merely contain "mock"
+def should_mock(url: str) -> bool:
+    return (urlsplit(url).hostname or "").endswith(".mock")
+
+
+# A leading "scheme://"; a URL elsewhere in the input (e.g. in a query
+# string) doesn't count
+SCHEME_RE = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*://")
+
 
 class AuditRequest(BaseModel):
-    url: str
+    # Malformed URLs are rejected with a 422 before any cache or upstream work
+    url: HttpUrl
+
+    # Bare domains ("example.com") are still accepted and audited over https
+    @field_validator("url", mode="before")
+    @classmethod
+    def default_scheme(cls, value):
+        if isinstance(value, str) and not SCHEME_RE.match(value):
+            return f"https://{value}"
+        return value
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 specifies for If-None-Match
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+# GET responses carry an ETag and the entry's remaining freshness, so browsers
+# can reuse them and revalidate with If-None-Match for an empty 304
+def conditional_response(entry: Dict[str, Any], if_none_match: Optional[str]) -> Response:
+    age = time.time() - entry["timestamp"]
+    remaining = max(0, int(entry_max_age(entry) - age))
+    headers = {"ETag": entry["etag"], "Cache-Control": f"public, max-age={remaining}"}
+    if etag_matches(if_none_match, entry["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
+
 
 @app.post("/api/audit")
 async def audit_url(request: AuditRequest):
-    url = request.url
-    
-    # Basic URL validation/ensure it calls http/https
-    if not url.startswith("http"):
-        url = f"https://{url}"
+    entry = await get_audit(normalize_url(str(request.url)))
+    return Response(content=entry["body"], media_type="application/json")
 
+
+# Cacheable equivalent of the POST: GET /api/audit?url=...
+@app.get("/api/audit")
+async def audit_url_get(
+    request: Annotated[AuditRequest, Query()],
+    if_none_match: Optional[str] = Header(None),
+):
+    entry = await get_audit(normalize_url(str(request.url)))
+    return conditional_response(entry, if_none_match)
+
+
+async def get_audit(url: str) -> Dict[str, Any]:
     # Check cache — mock entries expire quickly so real data can replace them
     now = time.time()
-    if url in CACHE:
-        entry = CACHE[url]
-        max_age = MOCK_CACHE_DURATION if entry["data"].get("is_mock") else CACHE_DURATION
-        if now - entry["timestamp"] < max_age:
-            return entry["data"]
-
-    # Google PageSpeed API URL
-    # Valid categories: accessibility, best-practices, performance, pwa, seo
-    # Strategy: mobile
-    api_key = os.getenv("GOOGLE_PAGESPEED_API_KEY", "")
-    params = {
-        "url": url,
-        "strategy": "mobile",
-        "category": ["performance", "accessibility", "best-practices", "seo"],
-    }
-    if api_key:
-        params["key"] = api_key
+    entry = await cache_get(url)
+    if entry is not None and is_fresh(entry, now):
+        return entry
+
+    # The fetch runs as its own task so it outlives whichever request started
+    # it; shield so a disconnecting client doesn't cancel it for the others
+    task = INFLIGHT.get(url)
+    if task is None:
+        task = asyncio.create_task(fetch_audit(url, now))
+        INFLIGHT[url] = task
+        task.add_done_callback(lambda _: INFLIGHT.pop(url, None))
+    return await asyncio.shield(task)
+
+
+async def fetch_audit(url: str, now: float) -> Dict[str, Any]:
+    # Reads are unlocked, so a Redis read can miss while another coroutine
+    # is finishing the same fetch; re-check now that this task owns the URL
+    entry = await cache_get(url)
+    if entry is None or not is_fresh(entry, now):
+        entry = await run_audit(url, now)
+    return entry
+
 
-    api_url = "https://www.googleapis.com/pagespeedonline/v5/runPagespeed"
+# Fetches and caches the audit for url, returning its cache entry
+async def run_audit(url: str, now: float) -> Dict[str, Any]:
+    params = {"url": url, **PAGESPEED_BASE_PARAMS}
+
+    # Known-mock hosts skip the upstream call and the exception path entirely
+    if should_mock(url):
+        entry = make_entry(build_mock(url), now)
+        await cache_set(url, entry)
+        return entry
 
     try:
-        if "mock" in url:
-            raise Exception("Force mock") # Simple way to trigger mock block for specific keyword
-            
-        async with httpx.AsyncClient() as client:
-            try:
-                # Add Referer header to satisfy API key restrictions
-                referer = os.getenv("APP_URL", "http://127.0.0.1:8000")
-                headers = {"Referer": referer}
-                # Lighthouse runs on very slow pages can take ~3 minutes; retry
-                # 429s with backoff instead of falling straight back to mock data
-                for attempt in range(3):
-                    async with PAGESPEED_SEMAPHORE:
-                        response = await client.get(api_url, params=params, headers=headers, timeout=180.0)
-                    if response.status_code == 429 and attempt < 2:
-                        await asyncio.sleep(2 ** attempt)
-                        continue
-                    break
-                if response.status_code == 429:
-                    print("Usage limit exceeded, falling back to mock data")
-                    raise Exception("Quota exceeded")
-                response.raise_for_status()
-                data = response.json()
-
-                # Extract relevant metrics
-                lighthouse = data.get("lighthouseResult", {})
-                categories = lighthouse.get("categories", {})
-                audits = lighthouse.get("audits", {})
-
-                # Helper to get display value or score
-                def get_metric(key, field="displayValue"):
-                    return audits.get(key, {}).get(field, "N/A")
-                
-                def get_score(key):
-                     return audits.get(key, {}).get("score", 0)
-
-                # Extract Opportunities (audits with score < 1 and type 'opportunity')
-                opportunities = []
-                for key, audit in audits.items():
-                    if audit.get("details", {}).get("type") == "opportunity" and audit.get("score", 1) < 0.9:
-                        opportunities.append({
-                            "id": key,
-                            "title": audit.get("title"),
-                            "description": audit.get("description"),
-                            "score": audit.get("score"),
-                            "saving": audit.get("details", {}).get("overallSavingsMs", 0)
-                        })
-                
-                # Sort opportunities by estimated savings (descending) and take top 5
-                opportunities.sort(key=lambda x: x.get("saving", 0), reverse=True)
-                opportunities = opportunities[:5]
-
-                result = {
-                    "url": url,
-                    "scores": {
-                        "performance": categories.get("performance", {}).get("score", 0),
-                        "accessibility": categories.get("accessibility", {}).get("score", 0),
-                        "best_practices": categories.get("best-practices", {}).get("score", 0),
-                        "seo": categories.get("seo", {}).get("score", 0),
-                    },
-                    "metrics": {
-                        "fcp": get_metric("first-contentful-paint"),
-                        "fcp_score": get_score("first-contentful-paint"),
-                        "lcp": get_metric("largest-contentful-paint"),
-                        "lcp_score": get_score("largest-contentful-paint"),
-                        "cls": get_metric("cumulative-layout-shift"),
-                        "cls_score": get_score("cumulative-layout-shift"),
-                        "tbt": get_metric("total-blocking-time"),
-                        "tbt_score": get_score("total-blocking-time"),
-                        "si": get_metric("speed-index"),
-                        "si_score": get_score("speed-index"),
-                    },
-                    "opportunities": opportunities,
-                    "is_mock": False
-                }
-            except httpx.HTTPStatusError as e:
-                raise HTTPException(status_code=e.response.status_code, detail=f"PageSpeed API error: {e.response.text}")
+        client = app.state.client
+        try:
+            # Lighthouse runs on very slow pages can take ~3 minutes; retry
+            # 429s with backoff instead of falling straight back to mock data
+            for attempt in range(3):
+                async with pagespeed_slot():
+                    response = await client.get(PAGESPEED_API_URL, params=params, headers=PAGESPEED_HEADERS, timeout=180.0)
+                if response.status_code == 429 and attempt < 2:
+                    await asyncio.sleep(2 ** attempt)
+                    continue
+                break
+            if response.status_code == 429:
+                logger.warning("Usage limit exceeded, falling back to mock data")
+                raise Exception("Quota exceeded")
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+
+            # Extract relevant metrics
+            lighthouse = data.get("lighthouseResult", EMPTY)
+            categories = lighthouse.get("categories", EMPTY)
+            audits = lighthouse.get("audits", EMPTY)
+
+            # One audit lookup per metric for both its display value and score
+            metrics = {}
+            for name, score_name, audit_id in METRIC_AUDITS:
+                audit = audits.get(audit_id, EMPTY)
+                metrics[name] = audit.get("displayValue", "N/A")
+                metrics[score_name] = audit.get("score", 0)
+
+            # Top 5 opportunities (type 'opportunity', score < 0.9) by estimated
+            # savings, selected in one pass without sorting the full list
+            opportunities = heapq.nlargest(
+                5,
+                (
+                    {
+                        "id": key,
+                        "title": audit.get("title"),
+                        "description": audit.get("description"),
+                        "score": audit.get("score"),
+                        "saving": details.get("overallSavingsMs", 0),
+                    }
+                    for key, audit in audits.items()
+                    if (details := audit.get("details", EMPTY)).get("type") == "opportunity"
+                    and audit.get("score", 1) < 0.9
+                ),
+                key=lambda x: x["saving"],
+            )
+
+            result = {
+                "url": url,
+                "scores": {
+                    "performance": categories.get("performance", EMPTY).get("score", 0),
+                    "accessibility": categories.get("accessibility", EMPTY).get("score", 0),
+                    "best_practices": categories.get("best-practices", EMPTY).get("score", 0),
+                    "seo": categories.get("seo", EMPTY).get("score", 0),
+                },
+                "metrics": metrics,
+                "opportunities": opportunities,
+                "is_mock": False
+            }
+        except httpx.HTTPStatusError as e:
+            raise HTTPException(status_code=e.response.status_code, detail=f"PageSpeed API error: {e.response.text}")
 
     except Exception as e:
         # Serve the last real audit if we have one — stale data beats fake data.
-        # Cache entries are never evicted, so expired real results are still here.
+        # Expiry doesn't evict, so an expired real result is still cached
+        # unless it was pushed out by capacity or STALE_CACHE_DURATION.
         # Don't refresh the timestamp: the next request should retry the live API.
-        if url in CACHE and CACHE[url]["data"].get("is_mock") is False:
-            print(f"Serving stale cached audit due to: {type(e).__name__}: {e} url={url}")
-            return CACHE[url]["data"]
+        stale = await cache_get(url)
+        if stale is not None and stale["is_mock"] is False:
+            logger.warning("Serving stale cached audit due to: %s: %s url=%s", type(e).__name__, e, url)
+            return stale
 
         # Include the exception type: httpx timeout errors stringify to ""
-        print(f"Using mock data due to: {type(e).__name__}: {e} url={url}")
-        # Mock Response
-        result = {
-            "url": url,
-            "scores": {
-                "performance": 0.72,
-                "accessibility": 0.85,
-                "best_practices": 0.90,
-                "seo": 0.92,
-            },
-            "metrics": {
-                "fcp": "1.2 s",
-                "fcp_score": 0.85,
-                "lcp": "2.1 s",
-                "lcp_score": 0.88,
-                "cls": "0.05",
-                "cls_score": 0.95,
-                "tbt": "120 ms",
-                "tbt_score": 0.90,
-                "si": "1.8 s",
-                "si_score": 0.82
-            },
-            "opportunities": [
-                {
-                    "id": "unused-javascript",
-                    "title": "Reduce unused JavaScript",
-                    "description": "Remove unused JavaScript to reduce bytes consumed by network activity.",
-                    "score": 0.65,
-                    "saving": 350
-                },
-                {
-                    "id": "modern-image-formats",
-                    "title": "Serve images in next-gen formats",
-                    "description": "Image formats like WebP and AVIF often provide better compression than PNG or JPEG.",
-                    "score": 0.70,
-                    "saving": 200
-                }
-            ],
-            "is_mock": True
-        }
+        logger.warning("Using mock data due to: %s: %s url=%s", type(e).__name__, e, url)
+        result = build_mock(url)
 
     # Update Cache
-    CACHE[url] = {
-        "data": result,
-        "timestamp": now
-    }
+    entry = make_entry(result, now)
+    await cache_set(url, entry)
 
-    return result
+    return entry
 
 if __name__ == "__main__":
     import uvicorn